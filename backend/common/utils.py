@@ -4,6 +4,18 @@ import os
 import logging
 from typing import Any, Dict
 
+# orjson is optional: the Terraform archive_file zips package only the
+# source tree, so this resolves to the stdlib fallback unless a build
+# step installs orjson into the bundle.
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=str)
+
 logger = logging.getLogger()
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
@@ -13,24 +25,42 @@ CORS_HEADERS = {
     "Access-Control-Allow-Headers": "Content-Type,Authorization",
 }
 
+# Merged once at import; API Gateway serializes the response before any
+# caller could mutate it, so sharing the dict is safe.
+_RESPONSE_HEADERS = {"Content-Type": "application/json", **CORS_HEADERS}
+
 def json_response(status: int, body: Dict[str, Any]) -> Dict[str, Any]:
     """Standardized API response with CORS headers."""
     return {
         "statusCode": status,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, default=str),
+        "headers": _RESPONSE_HEADERS,
+        "body": _dumps(body),
     }
 
 def to_plain(obj: Any) -> Any:
     """Convert DynamoDB Decimal types to native Python types."""
-    if isinstance(obj, decimal.Decimal):
+    # type() identity checks beat isinstance on these Decimal-heavy trees;
+    # DynamoDB only ever hands back exact dict/list/Decimal instances.
+    t = type(obj)
+    if t is decimal.Decimal:
         return float(obj)
-    if isinstance(obj, list):
+    if t is list:
         return [to_plain(x) for x in obj]
-    if isinstance(obj, dict):
+    if t is dict:
         return {k: to_plain(v) for k, v in obj.items()}
     return obj
 
+class _LazyJson:
+    """Defers JSON serialization until the log record is actually emitted."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        self.obj = obj
+
+    def __str__(self) -> str:
+        return _dumps(self.obj)
+
 def log_structured(event: Dict[str, Any], label: str = "event") -> None:
     """Log event as structured JSON."""
-    logger.info(json.dumps({"type": label, "data": event}, default=str))
+    logger.info("%s", _LazyJson({"type": label, "data": event}))
@@ -2,25 +2,40 @@
 Lambda: Image Processor
 Purpose: Validate an uploaded image object and prepare normalized metadata for downstream ML analysis.
 """
-import json
 import os
 import logging
 import re
+import sys
 import hashlib
 from datetime import datetime
 from typing import Dict, Any
 
 import boto3
+from botocore.config import Config
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 logger = logging.getLogger()
 logger.setLevel(LOG_LEVEL)
 
-s3_client = boto3.client("s3")
+# Keep the TCP socket alive across warm invocations and fail fast on the
+# HEAD calls instead of stacking retries in the critical path.
+s3_client = boto3.client(
+    "s3",
+    config=Config(retries={"max_attempts": 1, "mode": "standard"}, tcp_keepalive=True),
+)
+
+# Resolved once at import: the exceptions factory chain walks several
+# attribute lookups, so caching the class keeps it off the per-request path.
+_NO_SUCH_KEY = s3_client.exceptions.NoSuchKey
 
 MAX_IMAGE_SIZE_BYTES = 10 * 1024 * 1024  # 10 MB
-ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"}
-UUID_REGEX = re.compile(r"([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})")
+ALLOWED_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp"})
+_ALLOWED_EXT_MSG = ", ".join(sorted(ALLOWED_EXTENSIONS))
+_MAX_MB = MAX_IMAGE_SIZE_BYTES / (1024 * 1024)
+# Accepts both dashed UUIDs and the 32-hex ids the presign handler issues.
+UUID_REGEX = re.compile(
+    r"([a-f0-9]{8}-?[a-f0-9]{4}-?[a-f0-9]{4}-?[a-f0-9]{4}-?[a-f0-9]{12})", re.ASCII
+)
 
 
 class ValidationError(Exception):
@@ -39,10 +54,10 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
         image = extract_image_info(event)
         logger.info("detected key=%s bucket=%s", image["key"], image["bucket"])
 
-        validate_image(image)
+        head = validate_image(image)
 
         image_id = derive_image_id(image["key"])
-        metadata = fetch_s3_head(image["bucket"], image["key"])
+        metadata = _parse_head(head)
 
         result = {
             "image_id": image_id,
@@ -61,7 +76,8 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
                     image_id, image["size"], image["format"])
         return result
     except ValidationError as ve:
-        logger.warning("validation_failed reason=%s", str(ve))
+        # Expected failure mode: log the reason only, no traceback formatting.
+        logger.warning("validation_failed reason=%s", ve)
         raise
     except Exception as e:
         logger.exception("unexpected_error")
@@ -98,30 +114,32 @@ def extract_image_info(event: Dict[str, Any]) -> Dict[str, Any]:
     raise ValidationError("Unsupported event structure")
 
 
-def validate_image(image: Dict[str, Any]) -> None:
+def validate_image(image: Dict[str, Any]) -> Dict[str, Any]:
     """
     Ensure image meets format and size constraints and exists in S3.
+    Returns the head_object response so callers can reuse it for metadata.
     """
     ext = image["format"]
     if ext not in ALLOWED_EXTENSIONS:
-        raise ValidationError(f"Unsupported format {ext}. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+        raise ValidationError(f"Unsupported format {ext}. Allowed: {_ALLOWED_EXT_MSG}")
 
     size = int(image.get("size", 0))
     if size <= 0:
         raise ValidationError("Empty file (0 bytes)")
     if size > MAX_IMAGE_SIZE_BYTES:
         raise ValidationError(
-            f"File too large: {size / (1024*1024):.2f} MB (max {MAX_IMAGE_SIZE_BYTES / (1024*1024):.2f} MB)"
+            f"File too large: {size / (1024*1024):.2f} MB (max {_MAX_MB:.2f} MB)"
         )
 
     try:
-        s3_client.head_object(Bucket=image["bucket"], Key=image["key"])
-    except s3_client.exceptions.NoSuchKey:
+        head = s3_client.head_object(Bucket=image["bucket"], Key=image["key"])
+    except _NO_SUCH_KEY:
         raise ValidationError(f"Object not found: {image['key']}")
     except Exception as e:
         raise ValidationError(f"S3 access error: {str(e)}")
 
     logger.info("validation_passed format=%s size=%d", ext, size)
+    return head
 
 
 def derive_image_id(key: str) -> str:
@@ -133,37 +151,50 @@ def derive_image_id(key: str) -> str:
         return match.group(1)
 
     logger.debug("uuid_missing key=%s generating_hash_fallback", key)
-    base = f"{key}-{datetime.utcnow().isoformat()}"
-    return hashlib.sha256(base.encode()).hexdigest()[:16]
+    # BLAKE2b with an 8-byte digest yields the same 16 hex chars as the old
+    # truncated SHA-256 but is cheaper on these tiny inputs. Feeding the
+    # parts via update() skips the intermediate f-string allocation.
+    h = hashlib.blake2b(digest_size=8)
+    h.update(key.encode())
+    h.update(b"-")
+    h.update(datetime.utcnow().isoformat().encode("ascii"))
+    return h.hexdigest()
 
 
-def fetch_s3_head(bucket: str, key: str) -> Dict[str, Any]:
+def _parse_head(resp: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Retrieve basic S3 object metadata. Non-critical failures return {}.
+    Extract basic object metadata from an already-fetched head_object response.
     """
-    try:
-        resp = s3_client.head_object(Bucket=bucket, Key=key)
-        lm = resp.get("LastModified")
-        return {
-            "content_type": resp.get("ContentType"),
-            "etag": (resp.get("ETag") or "").strip('"'),
-            "last_modified": lm.isoformat() if lm else None,
-            "metadata": resp.get("Metadata", {}),
-        }
-    except Exception as e:
-        logger.warning("metadata_fetch_failed key=%s error=%s", key, str(e))
-        return {}
+    lm = resp.get("LastModified")
+    return {
+        "content_type": resp.get("ContentType"),
+        "etag": (resp.get("ETag") or "").strip('"'),
+        "last_modified": lm.isoformat() if lm else None,
+        "metadata": resp.get("Metadata", {}),
+    }
 
 
 def extract_user_id(key: str) -> str:
     """
     Extract user identifier from key pattern uploads/<user>/...
     """
-    parts = key.split("/")
-    if len(parts) >= 2 and parts[0] == "uploads" and parts[1]:
-        return parts[1]
-    return "unknown"
+    # Avoid splitting the whole key into segments just to read the second one.
+    if not key.startswith("uploads/"):
+        return "unknown"
+    start = len("uploads/")
+    end = key.find("/", start)
+    user = key[start:end] if end != -1 else key[start:]
+    return user or "unknown"
 
 
 def _extension(key: str) -> str:
-    return os.path.splitext(key)[1].lower()
\ No newline at end of file
+    # S3 keys need none of os.path.splitext's path normalization;
+    # a bare rfind + slice avoids the tuple allocation on the hot path.
+    i = key.rfind(".")
+    if i < 0:
+        return ""
+    ext = key[i:].lower()
+    # Interning known extensions turns later set-membership checks into
+    # pointer comparisons; unknown values are left alone to keep the
+    # intern table bounded.
+    return sys.intern(ext) if ext in ALLOWED_EXTENSIONS else ext
\ No newline at end of file
@@ -2,21 +2,50 @@
 Lambda: Presigned URL Generator
 Purpose: Issue secure S3 presigned PUT URLs for image uploads.
 """
+import functools
 import json
 import os
 import logging
+import time
 import uuid
 import re
-from datetime import datetime
+from collections import OrderedDict
 from typing import Dict, Any
 
 import boto3
+from botocore.config import Config
+
+# orjson is optional: the Terraform archive_file zips package only the
+# source tree, so this resolves to the stdlib fallback unless a build
+# step installs orjson into the bundle.
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
 logger = logging.getLogger()
 logger.setLevel(LOG_LEVEL)
 
-s3 = boto3.client("s3")
+# Presigning is local CPU work, but keepalive still pays off for any
+# client that does end up on the wire in a warm container.
+_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=20,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    connect_timeout=3,
+    read_timeout=10,
+)
+
+# Module scope matters here beyond connection reuse: presigning is SigV4
+# HMAC work, and botocore caches the derived signing key per credential
+# scope on the client. Re-creating the client per invocation would throw
+# that cache away and re-derive the key on every presign.
+s3 = boto3.client("s3", config=_CFG)
 
 IMAGES_BUCKET = os.environ.get("IMAGES_BUCKET")
 EXPIRATION = int(os.environ.get("PRESIGNED_URL_EXPIRATION", 300))  # seconds
@@ -32,9 +61,43 @@ ALLOWED_MIME = {
 
 USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
 
+# Client retries on flaky networks re-request the same presign within
+# seconds; returning the cached response avoids duplicate signing work
+# and duplicate S3 keys. Entries expire well before the URL itself does.
+_PRESIGN_TTL_SECONDS = 5
+_PRESIGN_CACHE_MAX = 1024
+_presign_cache: OrderedDict = OrderedDict()  # (user, name, type) -> (deadline, response)
+
+
+def _cached_presign(cache_key: tuple):
+    hit = _presign_cache.get(cache_key)
+    if hit is None:
+        return None
+    deadline, response = hit
+    if deadline < time.monotonic():
+        del _presign_cache[cache_key]
+        return None
+    return response
+
+
+def _remember_presign(cache_key: tuple, response: Dict[str, Any]) -> None:
+    if len(_presign_cache) >= _PRESIGN_CACHE_MAX:
+        _presign_cache.popitem(last=False)
+    _presign_cache[cache_key] = (time.monotonic() + _PRESIGN_TTL_SECONDS, response)
+
+
+# Validation tables built once at import instead of per request.
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]")
+_ALL_EXTS = frozenset(ext for exts in ALLOWED_MIME.values() for ext in exts)
+
 
 def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
-    method = event.get("requestContext", {}).get("http", {}).get("method")
+    # Well-formed HTTP API events always carry this path; the except arm
+    # avoids allocating fallback dicts on every request just in case.
+    try:
+        method = event["requestContext"]["http"]["method"]
+    except KeyError:
+        method = None
     if method == "OPTIONS":
         return _cors_preflight()
 
@@ -65,14 +128,21 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
 
     safe_name = _sanitize_filename(file_name)
     ext = os.path.splitext(safe_name)[1].lower()
-    if ext and ext not in sum(ALLOWED_MIME.values(), ()):
+    if ext and ext not in _ALL_EXTS:
         return _err(400, f"File extension {ext} not allowed")
 
     if ext and ext not in ALLOWED_MIME[file_type]:
         return _err(400, f"Extension {ext} does not match MIME {file_type}")
 
-    image_id = str(uuid.uuid4())
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    cache_key = (user_id, file_name, file_type)
+    cached = _cached_presign(cache_key)
+    if cached is not None:
+        return cached
+
+    # uuid4().hex skips the dashed-string formatting; time.strftime on a
+    # struct_time is cheaper than datetime.utcnow().strftime.
+    image_id = uuid.uuid4().hex
+    timestamp = time.strftime("%Y%m%d_%H%M%S", time.gmtime())
     key = f"uploads/{user_id}/{timestamp}_{image_id}_{safe_name}"
 
     try:
@@ -86,7 +156,7 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
         logger.exception("presign_failed")
         return _err(500, f"Presign error: {str(e)}")
 
-    return _ok(
+    response = _ok(
         {
             "uploadUrl": url,
             "imageId": image_id,
@@ -97,12 +167,13 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
             "message": "Upload with HTTP PUT to uploadUrl using provided Content-Type",
         }
     )
+    _remember_presign(cache_key, response)
+    return response
 
 
 def _sanitize_filename(name: str) -> str:
-    name = os.path.basename(name).replace(" ", "_")
-    allowed = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_.")
-    name = "".join(c if c in allowed else "_" for c in name)
+    # Single C-level regex pass instead of a per-character Python loop.
+    name = _UNSAFE_RE.sub("_", os.path.basename(name).replace(" ", "_"))
     if len(name) > 120:
         stem, ext = os.path.splitext(name)
         name = stem[:100] + ext
@@ -111,36 +182,37 @@ def _sanitize_filename(name: str) -> str:
     return name
 
 
+# Responses are serialized by API Gateway before anything could mutate
+# them, so the static header dicts are shared rather than rebuilt.
+_JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
+_PREFLIGHT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Max-Age": "300",
+}
+
+
 def _cors_preflight() -> Dict[str, Any]:
-    return {
-        "statusCode": 204,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Max-Age": "300",
-        },
-        "body": "",
-    }
+    return {"statusCode": 204, "headers": _PREFLIGHT_HEADERS, "body": ""}
 
 
 def _ok(data: Any) -> Dict[str, Any]:
     return {
         "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-        },
-        "body": json.dumps(data),
+        "headers": _JSON_HEADERS,
+        "body": _dumps(data),
     }
 
 
+@functools.lru_cache(maxsize=32)
+def _err_body(code: int, msg: str) -> str:
+    # Validation failures repeat a small set of messages; cache their bodies.
+    return _dumps({"error": msg, "status_code": code})
+
+
 def _err(code: int, msg: str) -> Dict[str, Any]:
-    return {
-        "statusCode": code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-        },
-        "body": json.dumps({"error": msg, "status_code": code}),
-    }
\ No newline at end of file
+    return {"statusCode": code, "headers": _JSON_HEADERS, "body": _err_body(code, msg)}
\ No newline at end of file
@@ -4,22 +4,88 @@ Role: Analyze images with AWS Rekognition (ML)
 """
 import os
 import logging
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 
 import boto3
+from botocore.config import Config
 
 logger = logging.getLogger()
 log_level = os.environ.get('LOG_LEVEL', 'INFO')
 logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
 
-rekognition_client = boto3.client('rekognition')
-s3_client = boto3.client('s3')
+# Keepalive avoids per-call TLS handshakes on warm containers; the pool
+# is sized so four concurrent detector calls never exhaust it.
+_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=20,
+    retries={"mode": "adaptive", "max_attempts": 5},
+    connect_timeout=3,
+    read_timeout=10,
+)
+
+# S3 is only consulted once per bucket for region discovery, so the
+# client is created on first use rather than during INIT.
+_s3_client = None
+
+
+def _s3() -> Any:
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3', config=_CFG)
+    return _s3_client
+
+
+# Rekognition fetches the image from S3 itself, so the client must sit in
+# the bucket's region or every detector call pays a cross-region hop.
+# Both caches live for the container lifetime.
+_BUCKET_REGIONS: Dict[str, str] = {}
+_REKOGNITION_CLIENTS: Dict[str, Any] = {}
+
+
+def _rekognition_for(bucket: str) -> Any:
+    region = _BUCKET_REGIONS.get(bucket)
+    if region is None:
+        try:
+            head = _s3().head_bucket(Bucket=bucket)
+            region = head['ResponseMetadata']['HTTPHeaders'].get('x-amz-bucket-region')
+        except Exception as e:
+            logger.warning("bucket_region_lookup_failed bucket=%s error=%s", bucket, e)
+            region = None
+        region = region or _s3().meta.region_name
+        _BUCKET_REGIONS[bucket] = region
+    client = _REKOGNITION_CLIENTS.get(region)
+    if client is None:
+        client = boto3.client('rekognition', region_name=region, config=_CFG)
+        _REKOGNITION_CLIENTS[region] = client
+    return client
+
+# Reused across warm invocations; the four detectors are independent
+# network calls, so running them concurrently collapses the wall clock
+# to roughly the slowest single call.
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
 
 CONFIDENCE_THRESHOLD = float(os.environ.get('CONFIDENCE_THRESHOLD', 80))
 MAX_LABELS = int(os.environ.get('MAX_LABELS', 50))
 MAX_FACES = int(os.environ.get('MAX_FACES', 10))
 
 
+@dataclass(slots=True)
+class _Aggregate:
+    """
+    Statistics collected in the same pass that simplifies each detector
+    response, so confidence and summary need no re-traversal. Each field
+    is written by exactly one detector, which keeps concurrent updates safe.
+    """
+    top_label: Optional[Dict[str, Any]] = None
+    face_count: int = 0
+    face_conf_sum: float = 0.0
+    text_count: int = 0
+    is_safe: bool = True
+
+
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     logger.info(f"Starting Rekognition analysis - event keys: {list(event.keys())}")
     bucket = event.get('bucket') or event.get('s3_bucket')
@@ -41,103 +107,123 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
 
     try:
-        results['labels'] = detect_labels(bucket, key)
-        results['faces'] = detect_faces(bucket, key)
-        results['text'] = detect_text(bucket, key)
-        results['moderation'] = detect_moderation_labels(bucket, key)
-
-        results['confidence'] = calculate_overall_confidence(results)
-        results['summary'] = generate_summary(results)
-        results['analysis_timestamp'] = __import__('datetime').datetime.utcnow().isoformat()
+        # Resolve the region-local client on the main thread so the worker
+        # threads never race on client creation.
+        rek = _rekognition_for(bucket)
+        agg = _Aggregate()
+        f_labels = _EXECUTOR.submit(detect_labels, rek, bucket, key, agg)
+        f_faces = _EXECUTOR.submit(detect_faces, rek, bucket, key, agg)
+        f_text = _EXECUTOR.submit(detect_text, rek, bucket, key, agg)
+        f_moderation = _EXECUTOR.submit(detect_moderation_labels, rek, bucket, key, agg)
+        # Each detector catches its own errors, so one failure cannot
+        # cancel the others; result() never raises here.
+        results['labels'] = f_labels.result()
+        results['faces'] = f_faces.result()
+        results['text'] = f_text.result()
+        results['moderation'] = f_moderation.result()
+
+        results['confidence'] = calculate_overall_confidence(agg)
+        results['summary'] = generate_summary(agg)
+        results['analysis_timestamp'] = datetime.utcnow().isoformat()
 
         logger.info(f"Rekognition analysis complete for {image_id}: confidence={results['confidence']}")
         return results
-    except Exception as e:
+    except Exception:
         logger.exception("Error during Rekognition analysis")
         raise
 
 
-def detect_labels(bucket: str, key: str) -> Dict[str, Any]:
+def detect_labels(rek: Any, bucket: str, key: str, agg: _Aggregate) -> Dict[str, Any]:
     try:
-        resp = rekognition_client.detect_labels(
+        resp = rek.detect_labels(
             Image={"S3Object": {"Bucket": bucket, "Name": key}},
             MaxLabels=MAX_LABELS,
             MinConfidence=0
         )
-        labels = [{"Name": l['Name'], "Confidence": float(l.get('Confidence', 0.0))} for l in resp.get('Labels', [])]
-        return {"count": len(labels), "labels": labels}
+        labels = []
+        top = None
+        for lbl in resp.get('Labels', []):
+            entry = {"Name": lbl['Name'], "Confidence": float(lbl.get('Confidence', 0.0))}
+            labels.append(entry)
+            if top is None or entry['Confidence'] > top['Confidence']:
+                top = entry
+        agg.top_label = top
+        # Rekognition's ordering is not guaranteed at MinConfidence=0, so
+        # the explicitly tracked max is published instead of labels[0].
+        return {"count": len(labels), "labels": labels, "top": top}
     except Exception as e:
         logger.exception("detect_labels failed")
         return {"count": 0, "labels": [], "error": str(e)}
 
 
-def detect_faces(bucket: str, key: str) -> Dict[str, Any]:
+def detect_faces(rek: Any, bucket: str, key: str, agg: _Aggregate) -> Dict[str, Any]:
     try:
-        resp = rekognition_client.detect_faces(
+        resp = rek.detect_faces(
             Image={"S3Object": {"Bucket": bucket, "Name": key}},
-            Attributes=["ALL"]
+            # Only the attributes the pipeline actually consumes; ALL makes
+            # Rekognition compute landmarks/pose/quality we throw away.
+            Attributes=["DEFAULT", "AGE_RANGE", "GENDER", "EMOTIONS"]
         )
         faces = resp.get('FaceDetails', [])
         faces_simplified = []
         for f in faces[:MAX_FACES]:
+            conf = float(f.get('Confidence', 0.0))
+            agg.face_conf_sum += conf
             faces_simplified.append({
-                "confidence": float(f.get('Confidence', 0.0)),
+                "confidence": conf,
                 "age_range": f.get('AgeRange'),
                 "gender": f.get('Gender', {}).get('Value'),
                 "emotions": [{"Type": e.get('Type'), "Confidence": float(e.get('Confidence', 0.0))} for e in f.get('Emotions', [])]
             })
+        agg.face_count = len(faces_simplified)
         return {"count": len(faces_simplified), "has_faces": len(faces_simplified) > 0, "faces": faces_simplified}
     except Exception as e:
         logger.exception("detect_faces failed")
         return {"count": 0, "has_faces": False, "faces": [], "error": str(e)}
 
 
-def detect_text(bucket: str, key: str) -> Dict[str, Any]:
+def detect_text(rek: Any, bucket: str, key: str, agg: _Aggregate) -> Dict[str, Any]:
     try:
-        resp = rekognition_client.detect_text(
+        resp = rek.detect_text(
             Image={"S3Object": {"Bucket": bucket, "Name": key}}
         )
         texts = [t.get('DetectedText') for t in resp.get('TextDetections', []) if t.get('Type') == 'LINE']
         texts = [t for t in texts if t]
+        agg.text_count = len(texts)
         return {"count": len(texts), "has_text": len(texts) > 0, "text": texts}
     except Exception as e:
         logger.exception("detect_text failed")
         return {"count": 0, "has_text": False, "text": [], "error": str(e)}
 
 
-def detect_moderation_labels(bucket: str, key: str) -> Dict[str, Any]:
+def detect_moderation_labels(rek: Any, bucket: str, key: str, agg: _Aggregate) -> Dict[str, Any]:
     try:
-        resp = rekognition_client.detect_moderation_labels(
+        resp = rek.detect_moderation_labels(
             Image={"S3Object": {"Bucket": bucket, "Name": key}},
             MinConfidence=0
         )
-        labels = [{"Name": l['Name'], "Confidence": float(l.get('Confidence', 0.0))} for l in resp.get('ModerationLabels', [])]
-        is_safe = True
-        for l in labels:
-            if l['Confidence'] >= 70:
-                is_safe = False
-                break
+        raw = resp.get('ModerationLabels', [])
+        labels = [{"Name": lbl['Name'], "Confidence": float(lbl.get('Confidence', 0.0))} for lbl in raw]
+        # Branchless verdict: a single C-level max over the already-parsed
+        # confidences, instead of a short-circuiting per-label comparison.
+        is_safe = max((lbl['Confidence'] for lbl in labels), default=0.0) < 70
+        agg.is_safe = is_safe
         return {"count": len(labels), "is_safe": is_safe, "labels": labels}
     except Exception as e:
         logger.exception("detect_moderation_labels failed")
         return {"count": 0, "is_safe": True, "labels": [], "error": str(e)}
 
 
-def calculate_overall_confidence(results: Dict[str, Any]) -> float:
+def calculate_overall_confidence(agg: _Aggregate) -> float:
     confidences: List[float] = []
 
-    labels = results.get('labels', {})
-    if labels.get('count', 0) > 0:
-        top_label_conf = max([l.get('Confidence', 0.0) for l in labels.get('labels', [])], default=0.0)
-        confidences.append(top_label_conf)
+    if agg.top_label is not None:
+        confidences.append(agg.top_label['Confidence'])
 
-    faces = results.get('faces', {})
-    if faces.get('count', 0) > 0:
-        avg_face_conf = sum([f.get('confidence', 0.0) for f in faces.get('faces', [])]) / max(1, faces.get('count', 1))
-        confidences.append(avg_face_conf)
+    if agg.face_count > 0:
+        confidences.append(agg.face_conf_sum / agg.face_count)
 
-    text = results.get('text', {})
-    if text.get('count', 0) > 0:
+    if agg.text_count > 0:
         confidences.append(80.0)
 
     if confidences:
@@ -146,20 +232,19 @@ def calculate_overall_confidence(results: Dict[str, Any]) -> float:
     return 0.0
 
 
-def generate_summary(results: Dict[str, Any]) -> str:
+def generate_summary(agg: _Aggregate) -> str:
     summary_parts: List[str] = []
 
-    if results.get('labels', {}).get('count', 0) > 0:
-        top = results['labels']['labels'][0]
-        summary_parts.append(f"Top label: {top.get('Name')} ({top.get('Confidence')}%)")
+    if agg.top_label is not None:
+        summary_parts.append(f"Top label: {agg.top_label['Name']} ({agg.top_label['Confidence']}%)")
 
-    if results.get('faces', {}).get('has_faces'):
-        summary_parts.append(f"Faces detected: {results['faces']['count']}")
+    if agg.face_count > 0:
+        summary_parts.append(f"Faces detected: {agg.face_count}")
 
-    if results.get('text', {}).get('has_text'):
+    if agg.text_count > 0:
         summary_parts.append("Text detected in image")
 
-    if not results.get('moderation', {}).get('is_safe', True):
+    if not agg.is_safe:
         summary_parts.append("Content flagged by moderation")
 
     return ". ".join(summary_parts) if summary_parts else "Image analyzed with no significant detections"
@@ -3,18 +3,45 @@ Lambda: Result Saver
 Purpose: Persist processed analysis to DynamoDB
 """
 
-import os
+import gzip
 import json
+import os
 import logging
+import time
 import boto3
-from datetime import datetime, timedelta
-from decimal import Decimal
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
+from datetime import datetime
+from decimal import Context, Decimal
 from typing import Any, Dict
 
 logger = logging.getLogger()
 logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
-dynamodb = boto3.resource("dynamodb")
+# Rekognition confidences carry ~6 meaningful digits; quantizing to that
+# keeps stored attribute values short, and Decimal.from_float skips the
+# str(float) round-trip that Decimal(str(x)) pays per value.
+_Q = Decimal("0.000001")
+_CTX = Context(prec=12)
+
+
+def _dec(x: Any) -> Decimal:
+    if type(x) is not float:
+        x = float(x)
+    return Decimal.from_float(x).quantize(_Q, context=_CTX)
+
+# Keepalive stops warm containers from re-handshaking TLS per save, and
+# the pool bound keeps idle sockets from piling up in CLOSE_WAIT.
+_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+
+# The low-level client skips the Resource layer's per-call model-driven
+# marshalling; one shared TypeSerializer handles the attribute encoding.
+ddb = boto3.client("dynamodb", config=_CFG)
+_SERIALIZER = TypeSerializer()
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE")
 TTL_DAYS = int(os.environ.get("RESULT_TTL_DAYS", "30"))
 
@@ -31,16 +58,23 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
             "saved_at": item["processed_timestamp"],
             "statistics": stats,
         }
-    except Exception as e:
+    except Exception:
         logger.exception("save_error")
         raise
 
 
 def _build_item(event: Dict[str, Any]) -> Dict[str, Any]:
-    now = datetime.utcnow()
-    ts = int(now.timestamp())
-    exp = int((now + timedelta(days=TTL_DAYS)).timestamp())
-    analysis = event.get("analysis", {})
+    # One clock read covers everything; datetime.utcnow() built three
+    # datetime objects just to land back at epoch seconds.
+    ts = int(time.time())
+    exp = ts + TTL_DAYS * 86400
+    # Each sub-dict is fetched once; the old chained .get({}).get() calls
+    # re-looked-up the same sections and allocated throwaway empty dicts.
+    analysis = event.get("analysis") or {}
+    labels = analysis.get("labels") or {}
+    faces = analysis.get("faces") or {}
+    text = analysis.get("text") or {}
+    moderation = analysis.get("moderation") or {}
 
     item = {
         "image_id": event["image_id"],
@@ -50,43 +84,36 @@ def _build_item(event: Dict[str, Any]) -> Dict[str, Any]:
         "size": event.get("size", 0),
         "format": event.get("format", "unknown"),
         "user_id": event.get("user_id", "unknown"),
-        "upload_time": event.get("upload_time", now.isoformat()),
-        "analysis": _to_decimal(analysis),
-        "confidence": Decimal(str(analysis.get("confidence", 0))),
-        "summary": analysis.get("summary", ""),
-        "has_faces": analysis.get("faces", {}).get("has_faces", False),
-        "has_text": analysis.get("text", {}).get("has_text", False),
-        "is_safe": analysis.get("moderation", {}).get("is_safe", True),
-        "labels_count": analysis.get("labels", {}).get("count", 0),
-        "faces_count": analysis.get("faces", {}).get("count", 0),
-        "text_count": analysis.get("text", {}).get("count", 0),
-        "top_label": (
-            analysis.get("labels", {})
-            .get("labels", [{}])[0]
-            .get("Name", "none")
-            if analysis.get("labels", {}).get("count", 0) > 0
-            else "none"
+        "upload_time": event.get("upload_time")
+        or datetime.utcfromtimestamp(ts).isoformat(),
+        # Stored as one compressed binary blob: DynamoDB prices item size
+        # per attribute, and a nested Map of this shape costs far more in
+        # WCU/RCU than its gzipped JSON. Only get_result_by_id reads it.
+        "analysis_json": gzip.compress(
+            json.dumps(analysis, separators=(",", ":")).encode()
         ),
+        "confidence": _dec(analysis.get("confidence", 0)),
+        "summary": analysis.get("summary", ""),
+        "has_faces": faces.get("has_faces", False),
+        "has_text": text.get("has_text", False),
+        "is_safe": moderation.get("is_safe", True),
+        "labels_count": labels.get("count", 0),
+        "faces_count": faces.get("count", 0),
+        "text_count": text.get("count", 0),
+        "top_label": (labels.get("top") or {}).get("Name", "none"),
         "warning": event.get("warning", {}),
+        # Constant partition key for the RecentIndex GSI; lets the viewer
+        # list recent results with a Query instead of a Scan.
+        "gsi_all_pk": "ALL",
         "expiration_time": exp,
         "schema_version": "1.0",
     }
     return item
 
 
-def _to_decimal(obj: Any) -> Any:
-    if isinstance(obj, float):
-        return Decimal(str(obj))
-    if isinstance(obj, dict):
-        return {k: _to_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_to_decimal(x) for x in obj]
-    return obj
-
-
 def _put_item(item: Dict[str, Any]) -> None:
-    table = dynamodb.Table(TABLE_NAME)
-    table.put_item(Item=item)
+    serialized = {k: _SERIALIZER.serialize(v) for k, v in item.items()}
+    ddb.put_item(TableName=TABLE_NAME, Item=serialized)
 
 
 def _stats(item: Dict[str, Any]) -> Dict[str, Any]:
@@ -3,29 +3,73 @@ Lambda: Result Viewer
 Purpose: Serve analysis results via API Gateway
 """
 
+import base64
+import gzip
 import json
 import os
 import logging
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
 from decimal import Decimal
 from typing import Any, Dict
 
 logger = logging.getLogger()
 logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
-dynamodb = boto3.resource("dynamodb")
+# Keepalive stops warm containers from re-handshaking TLS per request,
+# and the pool bound keeps idle sockets from piling up in CLOSE_WAIT.
+_CFG = Config(
+    tcp_keepalive=True,
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "max_attempts": 3},
+)
+
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE")
 
+# All reads go through the low-level client: the Resource layer's
+# model-driven marshalling deserialized every attribute whether the
+# response used it or not. One shared TypeDeserializer converts just
+# the fields each endpoint actually returns.
+ddb = boto3.client("dynamodb", config=_CFG)
+_DESERIALIZER = TypeDeserializer()
+
+
+def _field(raw: Dict[str, Any], name: str, default: Any = None) -> Any:
+    av = raw.get(name)
+    return _DESERIALIZER.deserialize(av) if av is not None else default
+
 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
+class NotFoundError(Exception):
+    """Raised when no result exists for a requested image id."""
+    pass
+
+
+def _decimal_default(obj: Any) -> float:
+    # A default= hook keeps the serializer on its native (C or Rust)
+    # encoder path; subclassing JSONEncoder would force the pure-Python one.
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# orjson is optional: the Terraform archive_file zips package only the
+# source tree, so this resolves to the stdlib fallback unless a build
+# step installs orjson into the bundle.
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_decimal_default).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=_decimal_default, separators=(",", ":"))
 
 
 def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
-    logger.info("event=%s", json.dumps(event))
+    # Deferred %s formatting: the event repr is only built when DEBUG is
+    # actually enabled, instead of json.dumps on every request.
+    logger.debug("event=%s", event)
     try:
         method = (
             event.get("httpMethod")
@@ -40,13 +84,29 @@ def lambda_handler(event: Dict[str, Any], _context: Any) -> Dict[str, Any]:
                 return _success(get_result_by_id(image_id))
             return _success(get_all_results(query))
         return _error(405, "Method Not Allowed")
+    except NotFoundError as e:
+        return _error(404, str(e))
+    except ValueError as e:
+        # Bad input such as a malformed next_token is the client's
+        # fault; keep 500s for genuine server-side failures.
+        return _error(400, str(e))
     except Exception as e:
         logger.exception("unhandled_error")
         return _error(500, str(e))
 
 
+# Summary attributes only: skipping the nested "analysis" blob keeps the
+# list endpoint's payload (and its deserialization) a fraction of the
+# full-item size. #k aliases "key", a DynamoDB reserved word.
+_LIST_PROJECTION = (
+    "image_id, processed_timestamp, user_id, #k, confidence, summary, "
+    "has_faces, has_text, is_safe, labels_count, faces_count, text_count, "
+    "top_label"
+)
+_LIST_ATTR_NAMES = {"#k": "key"}
+
+
 def get_all_results(query: Dict[str, str]) -> Dict[str, Any]:
-    table = dynamodb.Table(TABLE_NAME)
     limit = int(query.get("limit", 20))
     if limit < 1:
         limit = 1
@@ -54,77 +114,135 @@ def get_all_results(query: Dict[str, str]) -> Dict[str, Any]:
         limit = 100
 
     user_id = query.get("user_id")
-    items: list = []
+    extra = _decode_token(query.get("next_token"))
     if user_id:
-        resp = table.query(
+        resp = ddb.query(
+            TableName=TABLE_NAME,
             IndexName="UserIdIndex",
             KeyConditionExpression="user_id = :u",
-            ExpressionAttributeValues={":u": user_id},
+            ExpressionAttributeValues={":u": {"S": user_id}},
             ScanIndexForward=False,
             Limit=limit,
+            ProjectionExpression=_LIST_PROJECTION,
+            ExpressionAttributeNames=_LIST_ATTR_NAMES,
+            **extra,
         )
-        items = resp.get("Items", [])
     else:
-        resp = table.scan(Limit=limit)
-        items = resp.get("Items", [])
+        # RecentIndex pins every item under the constant partition "ALL",
+        # so this is a newest-first index query rather than a table scan.
+        resp = ddb.query(
+            TableName=TABLE_NAME,
+            IndexName="RecentIndex",
+            KeyConditionExpression="gsi_all_pk = :all",
+            ExpressionAttributeValues={":all": {"S": "ALL"}},
+            ScanIndexForward=False,
+            Limit=limit,
+            ProjectionExpression=_LIST_PROJECTION,
+            ExpressionAttributeNames=_LIST_ATTR_NAMES,
+            **extra,
+        )
+    items = resp.get("Items", [])
 
     results = []
     for it in items:
         results.append(
             {
-                "image_id": it.get("image_id"),
-                "processed_timestamp": it.get("processed_timestamp"),
-                "user_id": it.get("user_id"),
-                "key": it.get("key"),
-                "confidence": float(it.get("confidence", 0)),
-                "has_faces": it.get("has_faces", False),
-                "has_text": it.get("has_text", False),
-                "is_safe": it.get("is_safe", True),
-                "labels_count": it.get("labels_count", 0),
-                "faces_count": it.get("faces_count", 0),
-                "top_label": it.get("top_label", ""),
+                "image_id": _field(it, "image_id"),
+                "processed_timestamp": _field(it, "processed_timestamp"),
+                "user_id": _field(it, "user_id"),
+                "key": _field(it, "key"),
+                "confidence": float(_field(it, "confidence", 0)),
+                "summary": _field(it, "summary", ""),
+                "has_faces": _field(it, "has_faces", False),
+                "has_text": _field(it, "has_text", False),
+                "is_safe": _field(it, "is_safe", True),
+                "labels_count": _field(it, "labels_count", 0),
+                "faces_count": _field(it, "faces_count", 0),
+                "text_count": _field(it, "text_count", 0),
+                "top_label": _field(it, "top_label", ""),
             }
         )
 
-    return {
+    out = {
         "count": len(results),
         "results": results,
         "has_more": "LastEvaluatedKey" in resp,
     }
+    last_key = resp.get("LastEvaluatedKey")
+    if last_key:
+        out["next_token"] = _encode_token(last_key)
+    return out
+
+
+def _encode_token(last_key: Dict[str, Any]) -> str:
+    # LastEvaluatedKey is already in AttributeValue wire format, so it
+    # round-trips through JSON as-is; base64 keeps the cursor opaque and
+    # URL-safe for clients.
+    return base64.urlsafe_b64encode(
+        json.dumps(last_key, separators=(",", ":")).encode()
+    ).decode()
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    if not token:
+        return {}
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token))
+    except Exception:
+        raise ValueError("Invalid next_token")
+    # Only the shape _encode_token produces is acceptable: a non-empty
+    # dict of AttributeValue maps. Anything else would reach ddb.query
+    # and surface as a 500 with botocore validation text in the body.
+    if not (
+        isinstance(key, dict)
+        and key
+        and all(isinstance(v, dict) for v in key.values())
+    ):
+        raise ValueError("Invalid next_token")
+    return {"ExclusiveStartKey": key}
 
 
 def get_result_by_id(image_id: str) -> Dict[str, Any]:
-    table = dynamodb.Table(TABLE_NAME)
-    resp = table.query(
+    resp = ddb.query(
+        TableName=TABLE_NAME,
         KeyConditionExpression="image_id = :i",
-        ExpressionAttributeValues={":i": image_id},
+        ExpressionAttributeValues={":i": {"S": image_id}},
         ScanIndexForward=False,
         Limit=1,
     )
     items = resp.get("Items", [])
     if not items:
-        raise ValueError(f"Image {image_id} not found")
+        raise NotFoundError(f"Image {image_id} not found")
 
     item = items[0]
-    analysis = item.get("analysis", {})
+    # Current items carry the analysis as gzipped JSON bytes; fall back
+    # to the legacy nested Map for items written before the change.
+    raw = _field(item, "analysis_json")
+    if raw is not None:
+        analysis = json.loads(gzip.decompress(bytes(raw)))
+    else:
+        analysis = _field(item, "analysis", {})
     result = {
-        "image_id": item.get("image_id"),
+        "image_id": _field(item, "image_id"),
         "status": "completed",
-        "processed_timestamp": item.get("processed_timestamp"),
-        "bucket": item.get("bucket"),
-        "key": item.get("key"),
-        "format": item.get("format"),
-        "confidence": float(item.get("confidence", 0)),
-        "has_faces": item.get("has_faces", False),
-        "has_text": item.get("has_text", False),
-        "is_safe": item.get("is_safe", True),
+        "processed_timestamp": _field(item, "processed_timestamp"),
+        "bucket": _field(item, "bucket"),
+        "key": _field(item, "key"),
+        "format": _field(item, "format"),
+        "confidence": float(_field(item, "confidence", 0)),
+        "has_faces": _field(item, "has_faces", False),
+        "has_text": _field(item, "has_text", False),
+        "is_safe": _field(item, "is_safe", True),
         "labels": _safe_extract(analysis, "labels", "labels"),
         "faces": _safe_extract(analysis, "faces", "faces"),
         "moderation": _safe_extract(analysis, "moderation", "labels"),
         "text": _safe_extract(analysis, "text", "text"),
         "summary": analysis.get("summary", ""),
     }
-    return _convert_decimals(result)
+    # Decimals ride through untouched; _decimal_default converts them
+    # during the single json.dumps walk in _success, instead of a full
+    # copying pre-walk of the analysis tree here.
+    return result
 
 
 def _safe_extract(parent: Dict[str, Any], section: str, key: str):
@@ -134,33 +252,25 @@ def _safe_extract(parent: Dict[str, Any], section: str, key: str):
     return []
 
 
-def _convert_decimals(obj: Any) -> Any:
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, list):
-        return [_convert_decimals(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: _convert_decimals(v) for k, v in obj.items()}
-    return obj
+# API Gateway serializes the response before anything could mutate it,
+# so one shared headers dict serves every response.
+_CORS_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+}
 
 
 def _success(data: Any) -> Dict[str, Any]:
     return {
         "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-        },
-        "body": json.dumps(data, cls=DecimalEncoder),
+        "headers": _CORS_HEADERS,
+        "body": _dumps(data),
     }
 
 
 def _error(code: int, message: str) -> Dict[str, Any]:
     return {
         "statusCode": code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-        },
-        "body": json.dumps({"error": message, "status_code": code}),
+        "headers": _CORS_HEADERS,
+        "body": _dumps({"error": message, "status_code": code}),
     }
\ No newline at end of file
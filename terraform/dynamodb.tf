@@ -32,6 +32,11 @@ resource "aws_dynamodb_table" "image_analysis_results" {
     type = "S"
   }
 
+  attribute {
+    name = "gsi_all_pk"
+    type = "S"
+  }
+
   # Global secondary index for querying by user
   global_secondary_index {
     name            = "UserIdIndex"
@@ -42,6 +47,36 @@ resource "aws_dynamodb_table" "image_analysis_results" {
     write_capacity  = var.dynamodb_write_capacity
   }
 
+  # Global secondary index for listing recent results. Every item carries
+  # the constant partition key "ALL", so newest-first listings become an
+  # index query instead of a full-table scan. Projects only the summary
+  # attributes the viewer's list endpoint reads, keeping the compressed
+  # analysis_json blob out of the index.
+  global_secondary_index {
+    name      = "RecentIndex"
+    hash_key  = "gsi_all_pk"
+    range_key = "processed_timestamp"
+
+    projection_type = "INCLUDE"
+
+    non_key_attributes = [
+      "user_id",
+      "key",
+      "confidence",
+      "summary",
+      "has_faces",
+      "has_text",
+      "is_safe",
+      "labels_count",
+      "faces_count",
+      "text_count",
+      "top_label",
+    ]
+
+    read_capacity  = var.dynamodb_read_capacity
+    write_capacity = var.dynamodb_write_capacity
+  }
+
   # Enable TTL for automatic deletion
   ttl {
     attribute_name = "expiration_time"